@@ -6,16 +6,24 @@ extern "C" {
 #endif
 
 #include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
 
 void *opencc_new();
 char *opencc_convert(const void *instance, const char *input, const char *config, bool punctuation);
+char *opencc_convert_len(const void *instance, const char *input, const char *config, bool punctuation, size_t *out_len);
+int opencc_convert_into(const void *instance, const unsigned char *input, size_t input_len, const char *config, bool punctuation, unsigned char *out_buf, size_t out_cap, size_t *out_len);
+int opencc_convert_file(const void *instance, const char *input_path, const char *output_path, const char *config, bool punctuation);
 int opencc_zho_check(const void *instance, const char *input);
 void opencc_free(const void *instance);
 void opencc_string_free(const char *ptr);
 char **opencc_jieba_cut(const void *instance, const char *input, bool hmm);
+char **opencc_jieba_cut_len(const void *instance, const char *input, bool hmm, size_t *out_len);
 void opencc_free_string_array(char **array);
 char *join_str(char **strings, const char *delimiter);
+char *join_str_packed(const unsigned char *data, const uint32_t *lengths, size_t count, const char *delimiter, size_t *out_len);
 char *opencc_jieba_cut_and_join(const void *instance, const char *input, bool hmm, const char *delimiter);
+char *opencc_jieba_cut_and_join_len(const void *instance, const char *input, bool hmm, const char *delimiter, size_t *out_len);
 
 #ifdef __cplusplus
 }
@@ -1,6 +1,25 @@
 use opencc_jieba_rs::OpenCC;
 use std::ffi::{c_char, CStr, CString};
+use std::fs::{self, File, OpenOptions};
+use std::io::{self, BufRead, BufReader, BufWriter, Seek, SeekFrom, Write};
+use std::path::PathBuf;
 use std::ptr;
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+// One instance is shared by every thread calling into the library, and callers such as
+// Python's ctypes drop their interpreter lock for the duration of each call.
+const _: () = {
+    const fn assert_send_sync<T: Send + Sync>() {}
+    assert_send_sync::<OpenCC>();
+};
+
+// Target size of each piece of text handed to the converter when streaming files
+const STREAM_CHUNK_SIZE: usize = 64 * 1024;
+// opencc_convert_file error codes, kept negative so they never clash with OS error codes
+const CONVERT_FILE_FAILED: i32 = -1;
+const CONVERT_FILE_INVALID_UTF8: i32 = -2;
+// Numbers the scratch files of concurrent opencc_convert_file calls within one process
+static SCRATCH_FILE_COUNTER: AtomicUsize = AtomicUsize::new(0);
 
 #[no_mangle]
 pub extern "C" fn opencc_new() -> *mut OpenCC {
@@ -42,6 +61,244 @@ pub extern "C" fn opencc_convert(
     c_result.into_raw()
 }
 
+#[no_mangle]
+pub extern "C" fn opencc_convert_len(
+    instance: *const OpenCC,
+    input: *const c_char,
+    config: *const c_char,
+    punctuation: bool,
+    out_len: *mut usize,
+) -> *mut c_char {
+    if instance.is_null() || input.is_null() || config.is_null() {
+        return ptr::null_mut();
+    }
+    let opencc = unsafe { &*instance };
+    // Unlike opencc_convert, invalid UTF-8 returns NULL rather than an empty string
+    let (input_str, config_str) = unsafe {
+        match (
+            CStr::from_ptr(input).to_str(),
+            CStr::from_ptr(config).to_str(),
+        ) {
+            (Ok(input_str), Ok(config_str)) => (input_str, config_str),
+            _ => return ptr::null_mut(),
+        }
+    };
+    let result = opencc.convert(input_str, config_str, punctuation);
+
+    if !out_len.is_null() {
+        unsafe { *out_len = result.len() };
+    }
+    CString::new(result).unwrap().into_raw()
+}
+
+// Convert into a caller-owned buffer. Returns 0 when the result was written, 1 when
+// out_buf is too small (nothing is written, *out_len holds the size needed), -1 on error.
+#[no_mangle]
+pub extern "C" fn opencc_convert_into(
+    instance: *const OpenCC,
+    input: *const u8,
+    input_len: usize,
+    config: *const c_char,
+    punctuation: bool,
+    out_buf: *mut u8,
+    out_cap: usize,
+    out_len: *mut usize,
+) -> i32 {
+    if instance.is_null() || config.is_null() || out_len.is_null() {
+        return -1;
+    }
+    if input.is_null() && input_len > 0 {
+        return -1;
+    }
+    let opencc = unsafe { &*instance };
+    let input_bytes: &[u8] = if input_len == 0 {
+        &[]
+    } else {
+        unsafe { std::slice::from_raw_parts(input, input_len) }
+    };
+    let (input_str, config_str) = match (
+        std::str::from_utf8(input_bytes),
+        unsafe { CStr::from_ptr(config) }.to_str(),
+    ) {
+        (Ok(input_str), Ok(config_str)) => (input_str, config_str),
+        _ => return -1,
+    };
+    let result = opencc.convert(input_str, config_str, punctuation);
+
+    unsafe { *out_len = result.len() };
+    if result.len() > out_cap {
+        return 1;
+    }
+    if !result.is_empty() {
+        unsafe { ptr::copy_nonoverlapping(result.as_ptr(), out_buf, result.len()) };
+    }
+    0
+}
+
+// Returns 0 on success, the OS error code when opening, reading or writing a file fails,
+// CONVERT_FILE_INVALID_UTF8 when the input is not UTF-8, and CONVERT_FILE_FAILED otherwise.
+// The converted text is staged in a scratch file in the system temp directory and only
+// written to output_path once the whole input has been converted. It is written through
+// the existing path, so links, permissions and ownership of the output are kept, and
+// input_path may be the same file as output_path.
+#[no_mangle]
+pub extern "C" fn opencc_convert_file(
+    instance: *const OpenCC,
+    input_path: *const c_char,
+    output_path: *const c_char,
+    config: *const c_char,
+    punctuation: bool,
+) -> i32 {
+    if instance.is_null() || input_path.is_null() || output_path.is_null() || config.is_null() {
+        return CONVERT_FILE_FAILED;
+    }
+    let opencc = unsafe { &*instance };
+    let (input_path, output_path, config) = unsafe {
+        match (
+            CStr::from_ptr(input_path).to_str(),
+            CStr::from_ptr(output_path).to_str(),
+            CStr::from_ptr(config).to_str(),
+        ) {
+            (Ok(input_path), Ok(output_path), Ok(config)) => (input_path, output_path, config),
+            _ => return CONVERT_FILE_FAILED,
+        }
+    };
+
+    let result = create_scratch_file().and_then(|(scratch_file, scratch_path)| {
+        let result = convert_file_via(
+            opencc,
+            input_path,
+            output_path,
+            scratch_file,
+            config,
+            punctuation,
+        );
+        // Only ever removes the file this call created
+        let _ = fs::remove_file(&scratch_path);
+        result
+    });
+    match result {
+        Ok(()) => 0,
+        Err(err) => match err.raw_os_error() {
+            Some(code) => code,
+            None if err.kind() == io::ErrorKind::InvalidData => CONVERT_FILE_INVALID_UTF8,
+            None => CONVERT_FILE_FAILED,
+        },
+    }
+}
+
+// Create a new, empty scratch file, skipping names left behind by other processes
+fn create_scratch_file() -> io::Result<(File, PathBuf)> {
+    loop {
+        let path = std::env::temp_dir().join(format!(
+            "opencc_convert_{}_{}.tmp",
+            std::process::id(),
+            SCRATCH_FILE_COUNTER.fetch_add(1, Ordering::Relaxed)
+        ));
+        match OpenOptions::new()
+            .read(true)
+            .write(true)
+            .create_new(true)
+            .open(&path)
+        {
+            Ok(file) => return Ok((file, path)),
+            Err(err) if err.kind() == io::ErrorKind::AlreadyExists => continue,
+            Err(err) => return Err(err),
+        }
+    }
+}
+
+// Convert input_path into scratch_file, then copy the result over output_path. The input
+// is read to the end before output_path is opened, and truncated, for writing.
+fn convert_file_via(
+    opencc: &OpenCC,
+    input_path: &str,
+    output_path: &str,
+    mut scratch_file: File,
+    config: &str,
+    punctuation: bool,
+) -> io::Result<()> {
+    convert_stream(
+        opencc,
+        BufReader::with_capacity(STREAM_CHUNK_SIZE, File::open(input_path)?),
+        BufWriter::with_capacity(STREAM_CHUNK_SIZE, &scratch_file),
+        config,
+        punctuation,
+    )?;
+    scratch_file.seek(SeekFrom::Start(0))?;
+    let mut output_file = File::create(output_path)?;
+    io::copy(&mut scratch_file, &mut output_file)?;
+    Ok(())
+}
+
+// Convert UTF-8 text from reader to writer a chunk at a time. Chunks end after the last
+// line break read, or failing that after whitespace or sentence punctuation. Jieba never
+// segments across those, so the output matches converting the whole text at once. Only a
+// stretch of text with none of them is held in memory whole.
+fn convert_stream<R: BufRead, W: Write>(
+    opencc: &OpenCC,
+    mut reader: R,
+    mut writer: W,
+    config: &str,
+    punctuation: bool,
+) -> io::Result<()> {
+    let mut chunk = Vec::with_capacity(2 * STREAM_CHUNK_SIZE);
+    let mut eof = false;
+    while !eof {
+        // Read at least another STREAM_CHUNK_SIZE bytes, or up to the end of the input
+        let target_len = chunk.len() + STREAM_CHUNK_SIZE;
+        while chunk.len() < target_len {
+            let buf = reader.fill_buf()?;
+            if buf.is_empty() {
+                eof = true;
+                break;
+            }
+            let len = buf.len();
+            chunk.extend_from_slice(buf);
+            reader.consume(len);
+        }
+        let end = if eof {
+            chunk.len()
+        } else {
+            match stream_split_point(&chunk)? {
+                Some(end) => end,
+                None => continue,
+            }
+        };
+        if end > 0 {
+            let text = std::str::from_utf8(&chunk[..end])
+                .map_err(|err| io::Error::new(io::ErrorKind::InvalidData, err))?;
+            writer.write_all(opencc.convert(text, config, punctuation).as_bytes())?;
+            chunk.drain(..end);
+        }
+    }
+    writer.flush()
+}
+
+// Where convert_stream may cut the text read so far, if anywhere
+fn stream_split_point(chunk: &[u8]) -> io::Result<Option<usize>> {
+    if let Some(pos) = chunk.iter().rposition(|&b| b == b'\n') {
+        return Ok(Some(pos + 1));
+    }
+    // The chunk may end partway through a character
+    let text = match std::str::from_utf8(chunk) {
+        Ok(text) => text,
+        Err(err) if err.error_len().is_none() => {
+            std::str::from_utf8(&chunk[..err.valid_up_to()]).unwrap()
+        }
+        Err(err) => return Err(io::Error::new(io::ErrorKind::InvalidData, err)),
+    };
+    // '\r' is left out as Jieba keeps "\r\n" together
+    Ok(text
+        .char_indices()
+        .rev()
+        .find(|&(_, ch)| {
+            (ch.is_whitespace() && ch != '\r')
+                || matches!(ch, '，' | '。' | '、' | '；' | '：' | '！' | '？')
+        })
+        .map(|(pos, ch)| pos + ch.len_utf8()))
+}
+
 #[no_mangle]
 pub extern "C" fn opencc_string_free(ptr: *mut std::os::raw::c_char) {
     if !ptr.is_null() {
@@ -57,6 +314,16 @@ pub extern "C" fn opencc_jieba_cut(
     instance: *const OpenCC,
     input: *const c_char,
     hmm: bool,
+) -> *mut *mut c_char {
+    opencc_jieba_cut_len(instance, input, hmm, ptr::null_mut())
+}
+
+#[no_mangle]
+pub extern "C" fn opencc_jieba_cut_len(
+    instance: *const OpenCC,
+    input: *const c_char,
+    hmm: bool,
+    out_len: *mut usize,
 ) -> *mut *mut c_char {
     if instance.is_null() {
         return ptr::null_mut();
@@ -64,7 +331,10 @@ pub extern "C" fn opencc_jieba_cut(
     if input.is_null() {
         return ptr::null_mut();
     }
-    let input_str = unsafe { CStr::from_ptr(input).to_str().unwrap() };
+    let input_str = match unsafe { CStr::from_ptr(input) }.to_str() {
+        Ok(input_str) => input_str,
+        Err(_) => return ptr::null_mut(),
+    };
 
     let opencc = unsafe { &(*instance) };
 
@@ -75,16 +345,22 @@ pub extern "C" fn opencc_jieba_cut(
         .map(|s| CString::new(s.to_string()).unwrap().into_raw())
         .collect();
 
+    // Number of segments, not counting the terminating null pointer
+    if !out_len.is_null() {
+        unsafe { *out_len = result_ptrs.len() };
+    }
     result_ptrs.push(ptr::null_mut());
 
-    let result_ptr = result_ptrs.as_mut_ptr();
-    std::mem::forget(result_ptrs);
-
-    result_ptr
+    // Shrink to an exact-size allocation, so opencc_free_string_array can rebuild and
+    // release it from the null-terminated length alone
+    Box::into_raw(result_ptrs.into_boxed_slice()) as *mut *mut c_char
 }
 
 #[no_mangle]
 pub extern "C" fn opencc_free_string_array(array: *mut *mut c_char) {
+    if array.is_null() {
+        return;
+    }
     let mut i = 0;
     loop {
         let ptr = unsafe { *array.offset(i) };
@@ -96,6 +372,10 @@ pub extern "C" fn opencc_free_string_array(array: *mut *mut c_char) {
         }
         i += 1;
     }
+    // Release the pointer array itself, including the terminating null
+    unsafe {
+        let _ = Box::from_raw(ptr::slice_from_raw_parts_mut(array, i as usize + 1));
+    }
 }
 
 #[no_mangle]
@@ -146,6 +426,60 @@ pub extern "C" fn join_str(strings: *mut *mut c_char, delimiter: *const c_char)
     CString::new(result).unwrap().into_raw()
 }
 
+#[no_mangle]
+pub extern "C" fn join_str_packed(
+    data: *const u8,
+    lengths: *const u32,
+    count: usize,
+    delimiter: *const c_char,
+    out_len: *mut usize,
+) -> *mut c_char {
+    // Report bad arguments with NULL, as panicking here would abort the calling process
+    if delimiter.is_null() {
+        return ptr::null_mut();
+    }
+    let delimiter_str = match unsafe { CStr::from_ptr(delimiter) }.to_str() {
+        Ok(delimiter_str) => delimiter_str,
+        Err(_) => return ptr::null_mut(),
+    };
+    // The strings arrive back to back in one buffer, with their byte lengths alongside
+    let lengths: &[u32] = if count == 0 || lengths.is_null() {
+        &[]
+    } else {
+        unsafe { std::slice::from_raw_parts(lengths, count) }
+    };
+    let total_len: usize = lengths.iter().map(|&len| len as usize).sum();
+    let data: &[u8] = if total_len == 0 || data.is_null() {
+        &[]
+    } else {
+        unsafe { std::slice::from_raw_parts(data, total_len) }
+    };
+
+    let mut result =
+        String::with_capacity(total_len + delimiter_str.len() * lengths.len().saturating_sub(1));
+    let mut offset = 0;
+    for (i, &len) in lengths.iter().enumerate() {
+        let len = len as usize;
+        if i > 0 {
+            result.push_str(delimiter_str);
+        }
+        // Replace invalid UTF-8 byte sequences with the replacement character
+        result.push_str(&String::from_utf8_lossy(&data[offset..offset + len]));
+        offset += len;
+    }
+
+    // Unlike NUL-terminated input, a string with an explicit length may contain a NUL,
+    // which cannot be returned as a C string
+    let result = match CString::new(result) {
+        Ok(result) => result,
+        Err(_) => return ptr::null_mut(),
+    };
+    if !out_len.is_null() {
+        unsafe { *out_len = result.as_bytes().len() };
+    }
+    result.into_raw()
+}
+
 #[no_mangle]
 pub extern "C" fn opencc_jieba_cut_and_join(
     instance: *const OpenCC,
@@ -153,12 +487,38 @@ pub extern "C" fn opencc_jieba_cut_and_join(
     hmm: bool,
     delimiter: *const c_char,
 ) -> *mut c_char {
-    let result_ptr = opencc_jieba_cut(instance, input, hmm);
-    let joined_ptr = join_str(result_ptr, delimiter);
-    if !result_ptr.is_null() {
-        opencc_free_string_array(result_ptr);
+    opencc_jieba_cut_and_join_len(instance, input, hmm, delimiter, ptr::null_mut())
+}
+
+#[no_mangle]
+pub extern "C" fn opencc_jieba_cut_and_join_len(
+    instance: *const OpenCC,
+    input: *const c_char,
+    hmm: bool,
+    delimiter: *const c_char,
+    out_len: *mut usize,
+) -> *mut c_char {
+    if instance.is_null() || input.is_null() || delimiter.is_null() {
+        return ptr::null_mut();
     }
-    joined_ptr
+    let opencc = unsafe { &*instance };
+    // Invalid UTF-8 returns NULL: panicking here would abort the calling process
+    let (input_str, delimiter_str) = unsafe {
+        match (
+            CStr::from_ptr(input).to_str(),
+            CStr::from_ptr(delimiter).to_str(),
+        ) {
+            (Ok(input_str), Ok(delimiter_str)) => (input_str, delimiter_str),
+            _ => return ptr::null_mut(),
+        }
+    };
+    // Join the segments directly, without a C string per segment in between
+    let joined = opencc.jieba.cut(input_str, hmm).join(delimiter_str);
+
+    if !out_len.is_null() {
+        unsafe { *out_len = joined.len() };
+    }
+    CString::new(joined).unwrap().into_raw()
 }
 
 #[no_mangle]
@@ -253,6 +613,222 @@ mod tests {
         );
     }
 
+    #[test]
+    fn test_opencc_convert_len() {
+        let opencc = opencc_new();
+        let c_config = CString::new("s2t").unwrap();
+        let c_input = CString::new("龙马精神").unwrap();
+        let mut out_len: usize = 0;
+        let result_ptr = opencc_convert_len(
+            opencc,
+            c_input.as_ptr(),
+            c_config.as_ptr(),
+            false,
+            &mut out_len,
+        );
+        let result_str = unsafe { CStr::from_ptr(result_ptr).to_str().unwrap().to_owned() };
+        assert_eq!(result_str, "龍馬精神");
+        assert_eq!(out_len, "龍馬精神".len());
+        opencc_string_free(result_ptr);
+        opencc_free(opencc);
+    }
+
+    #[test]
+    fn test_opencc_convert_into() {
+        let opencc = OpenCC::new();
+        let input = "龙马精神".as_bytes();
+        let c_config = CString::new("s2t").unwrap();
+        let mut out_len: usize = 0;
+        // Too small: reports the size needed without writing anything
+        let mut small_buf = [0u8; 4];
+        let code = opencc_convert_into(
+            &opencc as *const OpenCC,
+            input.as_ptr(),
+            input.len(),
+            c_config.as_ptr(),
+            false,
+            small_buf.as_mut_ptr(),
+            small_buf.len(),
+            &mut out_len,
+        );
+        assert_eq!(code, 1);
+        assert_eq!(out_len, "龍馬精神".len());
+        let mut out_buf = vec![0u8; out_len];
+        let code = opencc_convert_into(
+            &opencc as *const OpenCC,
+            input.as_ptr(),
+            input.len(),
+            c_config.as_ptr(),
+            false,
+            out_buf.as_mut_ptr(),
+            out_buf.len(),
+            &mut out_len,
+        );
+        assert_eq!(code, 0);
+        assert_eq!(
+            std::str::from_utf8(&out_buf[..out_len]).unwrap(),
+            "龍馬精神"
+        );
+    }
+
+    #[test]
+    fn test_opencc_convert_file_in_place() {
+        let opencc = OpenCC::new();
+        let path = std::env::temp_dir().join(format!("opencc_in_place_{}.txt", std::process::id()));
+        fs::write(&path, "龙马精神\n").unwrap();
+        let c_path = CString::new(path.to_str().unwrap()).unwrap();
+        let c_config = CString::new("s2t").unwrap();
+        let code = opencc_convert_file(
+            &opencc as *const OpenCC,
+            c_path.as_ptr(),
+            c_path.as_ptr(),
+            c_config.as_ptr(),
+            false,
+        );
+        let output = fs::read_to_string(&path).unwrap();
+        fs::remove_file(&path).unwrap();
+        assert_eq!(code, 0);
+        assert_eq!(output, "龍馬精神\n");
+    }
+
+    #[cfg(unix)]
+    #[test]
+    fn test_opencc_convert_file_through_symlink() {
+        let opencc = OpenCC::new();
+        let dir = std::env::temp_dir();
+        let input_path = dir.join(format!("opencc_link_in_{}.txt", std::process::id()));
+        let target_path = dir.join(format!("opencc_link_target_{}.txt", std::process::id()));
+        let link_path = dir.join(format!("opencc_link_{}.txt", std::process::id()));
+        fs::write(&input_path, "龙马精神\n").unwrap();
+        fs::write(&target_path, "").unwrap();
+        let _ = fs::remove_file(&link_path);
+        std::os::unix::fs::symlink(&target_path, &link_path).unwrap();
+        let c_input = CString::new(input_path.to_str().unwrap()).unwrap();
+        let c_output = CString::new(link_path.to_str().unwrap()).unwrap();
+        let c_config = CString::new("s2t").unwrap();
+        let code = opencc_convert_file(
+            &opencc as *const OpenCC,
+            c_input.as_ptr(),
+            c_output.as_ptr(),
+            c_config.as_ptr(),
+            false,
+        );
+        // The link is kept and the converted text lands in its target
+        let is_symlink = fs::symlink_metadata(&link_path)
+            .unwrap()
+            .file_type()
+            .is_symlink();
+        let output = fs::read_to_string(&target_path).unwrap();
+        fs::remove_file(&input_path).unwrap();
+        fs::remove_file(&target_path).unwrap();
+        fs::remove_file(&link_path).unwrap();
+        assert_eq!(code, 0);
+        assert!(is_symlink);
+        assert_eq!(output, "龍馬精神\n");
+    }
+
+    #[test]
+    fn test_opencc_convert_file_invalid_utf8() {
+        let opencc = OpenCC::new();
+        let dir = std::env::temp_dir();
+        let input_path = dir.join(format!("opencc_invalid_in_{}.txt", std::process::id()));
+        let output_path = dir.join(format!("opencc_invalid_out_{}.txt", std::process::id()));
+        fs::write(&input_path, [0xe4u8, 0xbd, b'\n']).unwrap();
+        fs::write(&output_path, "keep").unwrap();
+        let c_input = CString::new(input_path.to_str().unwrap()).unwrap();
+        let c_output = CString::new(output_path.to_str().unwrap()).unwrap();
+        let c_config = CString::new("s2t").unwrap();
+        let code = opencc_convert_file(
+            &opencc as *const OpenCC,
+            c_input.as_ptr(),
+            c_output.as_ptr(),
+            c_config.as_ptr(),
+            false,
+        );
+        // The existing output is left untouched
+        let output = fs::read_to_string(&output_path).unwrap();
+        fs::remove_file(&input_path).unwrap();
+        fs::remove_file(&output_path).unwrap();
+        assert_eq!(code, CONVERT_FILE_INVALID_UTF8);
+        assert_eq!(output, "keep");
+    }
+
+    #[test]
+    fn test_convert_stream() {
+        let opencc = OpenCC::new();
+        // Enough lines to span several chunks
+        let input = "龙马精神，“白日依山尽”\n".repeat(STREAM_CHUNK_SIZE / 16);
+        let mut output = Vec::new();
+        convert_stream(
+            &opencc,
+            io::Cursor::new(input.as_bytes()),
+            &mut output,
+            "s2t",
+            true,
+        )
+        .unwrap();
+        assert_eq!(
+            String::from_utf8(output).unwrap(),
+            opencc.convert(&input, "s2t", true)
+        );
+    }
+
+    #[test]
+    fn test_convert_stream_single_line() {
+        let opencc = OpenCC::new();
+        // One paragraph with no line breaks, longer than a chunk
+        let input = "龙马精神，白日依山尽。".repeat(STREAM_CHUNK_SIZE / 16);
+        let mut output = Vec::new();
+        convert_stream(
+            &opencc,
+            io::Cursor::new(input.as_bytes()),
+            &mut output,
+            "s2t",
+            false,
+        )
+        .unwrap();
+        assert_eq!(
+            String::from_utf8(output).unwrap(),
+            opencc.convert(&input, "s2t", false)
+        );
+    }
+
+    #[test]
+    fn test_stream_split_point() {
+        assert_eq!(
+            stream_split_point("龙马\n精神，白日".as_bytes()).unwrap(),
+            Some(7)
+        );
+        assert_eq!(
+            stream_split_point("龙马，精神".as_bytes()).unwrap(),
+            Some(9)
+        );
+        assert_eq!(stream_split_point("龙马 \r".as_bytes()).unwrap(), Some(7));
+        assert_eq!(stream_split_point("龙马精神".as_bytes()).unwrap(), None);
+        // Stops short of a character cut off at the end
+        assert_eq!(
+            stream_split_point(&"龙，马".as_bytes()[..7]).unwrap(),
+            Some(6)
+        );
+    }
+
+    #[test]
+    fn test_opencc_convert_len_invalid_utf8() {
+        let opencc = opencc_new();
+        let c_config = CString::new("s2t").unwrap();
+        let c_input = CString::new(vec![0xe4u8, 0xbd]).unwrap();
+        let mut out_len: usize = 0;
+        let result_ptr = opencc_convert_len(
+            opencc,
+            c_input.as_ptr(),
+            c_config.as_ptr(),
+            false,
+            &mut out_len,
+        );
+        assert!(result_ptr.is_null());
+        opencc_free(opencc);
+    }
+
     #[test]
     fn test_opencc_jieba_cut() {
         // Create OpenCC instance
@@ -291,6 +867,19 @@ mod tests {
         }
     }
 
+    #[test]
+    fn test_opencc_jieba_cut_len() {
+        let opencc = OpenCC::new();
+        let input = CString::new("你好，世界！").unwrap();
+        let mut out_len: usize = 0;
+        let result =
+            opencc_jieba_cut_len(&opencc as *const OpenCC, input.as_ptr(), true, &mut out_len);
+        assert_eq!(out_len, 4);
+        // The array stays null-terminated for opencc_free_string_array
+        assert!(unsafe { *result.add(out_len) }.is_null());
+        opencc_free_string_array(result);
+    }
+
     #[test]
     fn test_opencc_jieba_cut_and_join() {
         // Create OpenCC instance
@@ -316,6 +905,55 @@ mod tests {
         }
     }
 
+    #[test]
+    fn test_opencc_jieba_cut_and_join_len_invalid_utf8() {
+        let opencc = OpenCC::new();
+        let input = CString::new(vec![0xe4u8, 0xbd]).unwrap();
+        let delimiter = CString::new("/ ").unwrap();
+        let mut out_len: usize = 0;
+        let result = opencc_jieba_cut_and_join_len(
+            &opencc as *const OpenCC,
+            input.as_ptr(),
+            false,
+            delimiter.as_ptr(),
+            &mut out_len,
+        );
+        assert!(result.is_null());
+    }
+
+    #[test]
+    fn test_join_str_packed() {
+        let data = "白日依山尽".as_bytes();
+        let lengths: [u32; 3] = [6, 6, 3];
+        let delimiter = CString::new("; ").unwrap();
+        let mut out_len: usize = 0;
+        let result = join_str_packed(
+            data.as_ptr(),
+            lengths.as_ptr(),
+            lengths.len(),
+            delimiter.as_ptr(),
+            &mut out_len,
+        );
+        let result_string = unsafe { CString::from_raw(result).into_string().unwrap() };
+        assert_eq!(result_string, "白日; 依山; 尽");
+        assert_eq!(out_len, result_string.len());
+    }
+
+    #[test]
+    fn test_join_str_packed_nul() {
+        let data = b"a\0b";
+        let lengths: [u32; 1] = [3];
+        let delimiter = CString::new(" ").unwrap();
+        let result = join_str_packed(
+            data.as_ptr(),
+            lengths.as_ptr(),
+            lengths.len(),
+            delimiter.as_ptr(),
+            ptr::null_mut(),
+        );
+        assert!(result.is_null());
+    }
+
     #[test]
     fn test_join_str() {
         let strings = vec![
@@ -2,4 +2,4 @@
 # Author: Bryan Lai
 # January, 2024
 ##########################################################
-from .opencc_jieba_rs import OpenCC
+from .opencc_jieba_rs import OpenCC, OpenCCError
@@ -1,13 +1,22 @@
 from __future__ import print_function
 
 import argparse
+import codecs
 import sys
 import io
 from opencc_jieba_rs import OpenCC
 
 
+def is_utf8(encoding):
+    return codecs.lookup(encoding).name == 'utf-8'
+
+
 def main():
-    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        epilog='When both encodings are UTF-8 the text is converted as raw bytes, so line endings '
+               'are kept exactly as in the input. Other encodings are read and written in text mode, '
+               'which translates line endings to those of the platform.')
     parser.add_argument('-i', '--input', metavar='<file>',
                         help='Read original text from <file>.')
     parser.add_argument('-o', '--output', metavar='<file>',
@@ -28,11 +37,24 @@ def main():
 
     opencc = OpenCC(args.config)
 
-    with io.open(args.input if args.input else 0, encoding=args.in_enc) as f:
-        input_str = f.read()
-    output_str = opencc.convert(input_str, args.punct)
-    with io.open(args.output if args.output else 1, 'w', encoding=args.out_enc) as f:
-        f.write(output_str)
+    if args.input and args.output and is_utf8(args.in_enc) and is_utf8(args.out_enc):
+        # File to file in UTF-8: let the Rust side stream it in chunks. The output is only
+        # written once the input has been read, so converting a file in place works too.
+        opencc.convert_file(args.input, args.output, args.punct)
+    elif is_utf8(args.in_enc) and is_utf8(args.out_enc):
+        # UTF-8 both ways: pass the raw bytes through without decoding to str. Like
+        # convert_file, this leaves line endings as they are rather than translating them.
+        with io.open(args.input if args.input else 0, 'rb') as f:
+            input_b = f.read()
+        output_b = opencc.convert_bytes(input_b, args.punct)
+        with io.open(args.output if args.output else 1, 'wb') as f:
+            f.write(output_b)
+    else:
+        with io.open(args.input if args.input else 0, encoding=args.in_enc) as f:
+            input_str = f.read()
+        output_str = opencc.convert(input_str, args.punct)
+        with io.open(args.output if args.output else 1, 'w', encoding=args.out_enc) as f:
+            f.write(output_str)
 
     in_from = args.input if args.input else "<stdin>"
     out_to = args.output if args.output else "<stdout>"
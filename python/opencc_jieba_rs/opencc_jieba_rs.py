@@ -1,6 +1,8 @@
+import array
 import ctypes
 import os
 import platform
+import threading
 from typing import List
 
 # Determine the DLL file based on the operating system
@@ -13,86 +15,314 @@ elif platform.system() == 'Linux':
 else:
     raise OSError("Unsupported operating system")
 
-CONFIG_LIST = [
-    "s2t", "t2s", "s2tw", "tw2s", "s2twp", "tw2sp", "s2hk", "hk2s", "t2tw", "tw2t", "t2twp", "tw2t", "tw2tp",
+
+def _declare_prototypes(lib):
+    lib.opencc_new.restype = ctypes.c_void_p
+    lib.opencc_new.argtypes = []
+    lib.opencc_convert.restype = ctypes.c_void_p
+    lib.opencc_convert.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_bool]
+    lib.opencc_zho_check.restype = ctypes.c_int
+    lib.opencc_zho_check.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+    lib.opencc_free.argtypes = [ctypes.c_void_p]
+    lib.opencc_jieba_cut.restype = ctypes.POINTER(ctypes.c_char_p)
+    lib.opencc_jieba_cut.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_bool]
+    lib.opencc_jieba_cut_and_join.restype = ctypes.c_void_p
+    lib.opencc_jieba_cut_and_join.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_bool, ctypes.c_char_p]
+    lib.opencc_string_free.argtypes = [ctypes.c_void_p]
+    lib.opencc_free_string_array.argtypes = [ctypes.POINTER(ctypes.c_char_p)]
+    lib.join_str.restype = ctypes.c_void_p
+    lib.join_str.argtypes = [ctypes.POINTER(ctypes.c_char_p), ctypes.c_char_p]
+    if not hasattr(lib, 'opencc_convert_len'):
+        return
+    lib.opencc_convert_len.restype = ctypes.c_void_p
+    lib.opencc_convert_len.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_bool,
+                                       ctypes.POINTER(ctypes.c_size_t)]
+    lib.opencc_convert_into.restype = ctypes.c_int
+    lib.opencc_convert_into.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_size_t, ctypes.c_char_p,
+                                        ctypes.c_bool, ctypes.POINTER(ctypes.c_ubyte), ctypes.c_size_t,
+                                        ctypes.POINTER(ctypes.c_size_t)]
+    lib.opencc_convert_file.restype = ctypes.c_int
+    lib.opencc_convert_file.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p,
+                                        ctypes.c_bool]
+    lib.opencc_jieba_cut_len.restype = ctypes.POINTER(ctypes.c_char_p)
+    lib.opencc_jieba_cut_len.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_bool,
+                                         ctypes.POINTER(ctypes.c_size_t)]
+    lib.opencc_jieba_cut_and_join_len.restype = ctypes.c_void_p
+    lib.opencc_jieba_cut_and_join_len.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_bool,
+                                                  ctypes.c_char_p, ctypes.POINTER(ctypes.c_size_t)]
+    lib.join_str_packed.restype = ctypes.c_void_p
+    lib.join_str_packed.argtypes = [ctypes.c_char_p, ctypes.POINTER(ctypes.c_uint32), ctypes.c_size_t,
+                                    ctypes.c_char_p, ctypes.POINTER(ctypes.c_size_t)]
+
+
+# Load the DLL once per process; every OpenCC instance shares it and its prototypes
+_LIB = ctypes.CDLL(os.path.join(os.path.dirname(__file__), DLL_FILE))
+_declare_prototypes(_LIB)
+# Builds of the library older than the length-reporting API only export the original
+# functions; the methods below then take the same paths the binding always used
+_HAS_LEN_API = hasattr(_LIB, 'opencc_convert_len')
+
+# Decode UTF-8 results directly from the buffer returned by the DLL, without first
+# copying them into an intermediate bytes object
+_decode_utf8 = ctypes.pythonapi.PyUnicode_DecodeUTF8
+_decode_utf8.restype = ctypes.py_object
+_decode_utf8.argtypes = [ctypes.c_void_p, ctypes.c_ssize_t, ctypes.c_char_p]
+
+# opencc_convert_file error codes other than OS error codes
+_CONVERT_FILE_FAILED = -1
+_CONVERT_FILE_INVALID_UTF8 = -2
+
+CONFIG_SET = frozenset({
+    "s2t", "t2s", "s2tw", "tw2s", "s2twp", "tw2sp", "s2hk", "hk2s", "t2tw", "tw2t", "t2twp", "tw2tp",
     "t2hk", "hk2t", "t2jp", "jp2t"
-]
+})
+
+
+class OpenCCError(RuntimeError):
+    pass
+
+
+def _raise_invalid_utf8(*texts_b):
+    # The DLL rejects input that is not valid UTF-8; decoding it here raises the same
+    # UnicodeDecodeError, with the offending position, that a str caller would get
+    for text_b in texts_b:
+        text_b.decode('utf-8')
+    raise OpenCCError("Input rejected by the OpenCC library")
 
 
 class OpenCC:
+    _default = None
+    _default_lock = threading.Lock()
+
     def __init__(self, config=None):
-        self.config = config if config in CONFIG_LIST else "s2t"
-        # Load the DLL
-        dll_path = os.path.join(os.path.dirname(__file__), DLL_FILE)
-        self.lib = ctypes.CDLL(dll_path)
-        # Define function prototypes
-        self.lib.opencc_new.restype = ctypes.c_void_p
-        self.lib.opencc_new.argtypes = []
-        self.lib.opencc_convert.restype = ctypes.c_char_p
-        self.lib.opencc_convert.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_bool]
-        self.lib.opencc_zho_check.restype = ctypes.c_int
-        self.lib.opencc_zho_check.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
-        self.lib.opencc_free.argtypes = [ctypes.c_void_p]
-        self.lib.opencc_jieba_cut.restype = ctypes.POINTER(ctypes.c_char_p)
-        self.lib.opencc_jieba_cut.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_bool]
-        self.lib.opencc_jieba_cut_and_join.restype = ctypes.c_char_p
-        self.lib.opencc_jieba_cut_and_join.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_bool, ctypes.c_char_p]
-        self.lib.opencc_string_free.argtypes = [ctypes.c_char_p]
-        self.lib.opencc_free_string_array.argtypes = [ctypes.POINTER(ctypes.c_char_p)]
-        self.lib.join_str.restype = ctypes.c_char_p
-        self.lib.join_str.argtypes = [ctypes.POINTER(ctypes.c_char_p), ctypes.c_char_p]
+        self._config_fixed = False
+        self.config = config
+        self.lib = _LIB
+        # Create the native instance once and reuse it for every call; constructing it
+        # loads the Jieba and OpenCC dictionaries. The Rust side only ever borrows it
+        # immutably, so one instance may be shared across threads without locking.
+        # CDLL releases the GIL around every foreign call, so conversions running in
+        # several threads proceed in parallel.
+        self.opencc_instance = self.lib.opencc_new()
+        if not self.opencc_instance:
+            raise OpenCCError("opencc_new failed")
+
+    @classmethod
+    def default(cls):
+        """Return the process-wide OpenCC instance with the default "s2t" config.
+
+        The instance is created on first use, once even when several threads ask at the same
+        time, so its dictionaries are loaded only once per process. Because it is shared, its
+        config is fixed: assigning to it raises AttributeError. Construct OpenCC(config) for
+        any other conversion.
+        """
+        if cls._default is None:
+            with cls._default_lock:
+                if cls._default is None:
+                    instance = cls()
+                    instance._config_fixed = True
+                    cls._default = instance
+        return cls._default
+
+    @property
+    def config(self):
+        return self._config
+
+    @config.setter
+    def config(self, config):
+        if self._config_fixed:
+            raise AttributeError("the config of OpenCC.default() cannot be changed")
+        # Accept "S2T", "s2T", ... the same as "s2t" rather than falling back to the default;
+        # anything that is not a string still falls back
+        config = config.lower() if isinstance(config, str) else None
+        self._config = config if config in CONFIG_SET else "s2t"
+        # Encoded once here so convert() can hand the bytes straight to ctypes
+        self._config_b = self._config.encode('utf-8')
+
+    def __del__(self):
+        if hasattr(self, 'opencc_instance') and self.opencc_instance is not None:
+            self.lib.opencc_free(self.opencc_instance)
+            self.opencc_instance = None
 
     def convert(self, text, punctuation=False):
-        opencc = self.lib.opencc_new()
-        if opencc is None:
+        # None of the dictionaries map ASCII text, so skip the round trip for it
+        if text.isascii():
+            return text
+        if not _HAS_LEN_API:
+            result_ptr = self.lib.opencc_convert(self.opencc_instance, text.encode('utf-8'), self._config_b,
+                                                 punctuation)
+            return self._take_bytes(result_ptr).decode('utf-8')
+        out_len = ctypes.c_size_t()
+        result_ptr = self.lib.opencc_convert_len(self.opencc_instance, text.encode('utf-8'), self._config_b,
+                                                 punctuation, ctypes.byref(out_len))
+        if not result_ptr:
             return text
-        result = self.lib.opencc_convert(opencc, text.encode('utf-8'), self.config.encode('utf-8'), punctuation)
-        self.lib.opencc_free(opencc)
-        return result.decode('utf-8')
+        return self._take_string(result_ptr, out_len.value)
+
+    def convert_bytes(self, text_b: bytes, punctuation=False) -> bytes:
+        # UTF-8 in, UTF-8 out: for callers that already hold encoded text
+        if text_b.isascii():
+            return text_b
+        if not _HAS_LEN_API:
+            # The original function cannot report invalid UTF-8, so check it up front
+            text_b.decode('utf-8')
+            return self._take_bytes(self.lib.opencc_convert(self.opencc_instance, text_b, self._config_b,
+                                                            punctuation))
+        out_len = ctypes.c_size_t()
+        result_ptr = self.lib.opencc_convert_len(self.opencc_instance, text_b, self._config_b, punctuation,
+                                                 ctypes.byref(out_len))
+        if not result_ptr:
+            _raise_invalid_utf8(text_b)
+        return self._take_bytes(result_ptr, out_len.value)
+
+    def convert_into(self, text_b: bytes, out: bytearray, punctuation=False) -> int:
+        # Write the converted UTF-8 text into the caller's buffer and return its length in
+        # bytes. Like convert_bytes it takes UTF-8 bytes rather than str, so a caller reusing
+        # out across calls does no encoding either. A buffer that is already large enough
+        # keeps its size. A smaller one is grown to fit the result, and ends right after it
+        # rather than in padding added here.
+        if not _HAS_LEN_API:
+            result_b = self.convert_bytes(text_b, punctuation)
+            if len(out) < len(result_b):
+                out.extend(bytes(len(result_b) - len(out)))
+            out[:len(result_b)] = result_b
+            return len(result_b)
+        # Converted text is close to the input length, so with this headroom the result
+        # practically always fits the first time; a retry would convert the text again
+        cap = len(out)
+        min_cap = len(text_b) + len(text_b) // 2
+        if cap < min_cap:
+            out.extend(bytes(min_cap - cap))
+        out_len = ctypes.c_size_t()
+        code = self._convert_into(text_b, out, punctuation, out_len)
+        if code == 1:
+            out.extend(bytes(out_len.value - len(out)))
+            code = self._convert_into(text_b, out, punctuation, out_len)
+        if code != 0:
+            del out[cap:]
+            raise OpenCCError("opencc_convert_into failed")
+        # Drop the headroom the result did not use
+        del out[max(cap, out_len.value):]
+        return out_len.value
+
+    def _convert_into(self, text_b, out, punctuation, out_len):
+        # The ctypes view exports out's buffer only for the duration of this call, so the
+        # caller is free to resize it afterwards
+        out_buf = (ctypes.c_ubyte * len(out)).from_buffer(out)
+        return self.lib.opencc_convert_into(self.opencc_instance, text_b, len(text_b), self._config_b, punctuation,
+                                            out_buf, len(out), ctypes.byref(out_len))
+
+    def convert_file(self, input_path, output_path, punctuation=False):
+        # Stream a UTF-8 file through the converter on the Rust side, so the whole text
+        # is never held in Python. output_path is only written once the conversion succeeds,
+        # through its existing path, and may be the same file as input_path.
+        if not _HAS_LEN_API:
+            with open(input_path, 'rb') as f:
+                input_b = f.read()
+            try:
+                output_b = self.convert_bytes(input_b, punctuation)
+            except UnicodeDecodeError:
+                raise OpenCCError(f"{input_path} is not valid UTF-8") from None
+            with open(output_path, 'wb') as f:
+                f.write(output_b)
+            return
+        code = self.lib.opencc_convert_file(self.opencc_instance, os.fsencode(input_path), os.fsencode(output_path),
+                                            self._config_b, punctuation)
+        if code == 0:
+            return
+        if code == _CONVERT_FILE_INVALID_UTF8:
+            raise OpenCCError(f"{input_path} is not valid UTF-8")
+        if code > 0:
+            if platform.system() == 'Windows':
+                raise OSError(0, ctypes.FormatError(code), input_path, code, output_path)
+            raise OSError(code, os.strerror(code), input_path, None, output_path)
+        raise OpenCCError(f"Failed to convert {input_path} -> {output_path}")
 
     def zho_check(self, text):
-        opencc = self.lib.opencc_new()
-        code = self.lib.opencc_zho_check(opencc, text.encode('utf-8'))
-        self.lib.opencc_free(opencc)
-        return code
+        return self.lib.opencc_zho_check(self.opencc_instance, text.encode('utf-8'))
 
     def jieba_cut(self, text, hmm=False):
-        opencc = self.lib.opencc_new()
-        result_ptr = self.lib.opencc_jieba_cut(opencc, text.encode('utf-8'), hmm)
-        if result_ptr is None:
+        if not _HAS_LEN_API:
+            result_ptr = self.lib.opencc_jieba_cut(self.opencc_instance, text.encode('utf-8'), hmm)
+            if not result_ptr:
+                return [text]
+            result = []
+            i = 0
+            while result_ptr[i] is not None:
+                result.append(result_ptr[i].decode('utf-8'))
+                i += 1
+            self.lib.opencc_free_string_array(result_ptr)
+            return result
+        out_len = ctypes.c_size_t()
+        result_ptr = self.lib.opencc_jieba_cut_len(self.opencc_instance, text.encode('utf-8'), hmm,
+                                                   ctypes.byref(out_len))
+        if not result_ptr:
             return [text]
 
-        result = []
-        i = 0
-        while True:
-            string_ptr = result_ptr[i]
-            if string_ptr is None:
-                break
-            result.append(ctypes.string_at(string_ptr).decode('utf-8'))
-            i += 1
+        # View the pointer array in place as a fixed-size ctypes array, so the segments are
+        # read in one pass instead of indexing the pointer once per token
+        string_array = (ctypes.c_char_p * out_len.value).from_address(ctypes.addressof(result_ptr.contents))
+        result = list(map(bytes.decode, string_array))
 
         self.lib.opencc_free_string_array(result_ptr)
-        self.lib.opencc_free(opencc)
         return result
 
     def jieba_cut_and_join(self, text, hmm=False, delimiter=", "):
-        opencc = self.lib.opencc_new()
-        result_ptr = self.lib.opencc_jieba_cut_and_join(opencc, text.encode('utf-8'), hmm, delimiter.encode('utf-8'))
-        if result_ptr is None:
+        if not _HAS_LEN_API:
+            result_ptr = self.lib.opencc_jieba_cut_and_join(self.opencc_instance, text.encode('utf-8'), hmm,
+                                                            delimiter.encode('utf-8'))
+            if not result_ptr:
+                return text
+            return self._take_bytes(result_ptr).decode('utf-8')
+        out_len = ctypes.c_size_t()
+        result_ptr = self.lib.opencc_jieba_cut_and_join_len(self.opencc_instance, text.encode('utf-8'), hmm,
+                                                            delimiter.encode('utf-8'), ctypes.byref(out_len))
+        if not result_ptr:
             return text
-        result = ctypes.string_at(result_ptr).decode('utf-8')
-        # self.lib.opencc_string_free(result_ptr)
-        self.lib.opencc_free(opencc)
-        return result
+        return self._take_string(result_ptr, out_len.value)
+
+    def jieba_cut_and_join_bytes(self, text_b: bytes, hmm=False, delimiter_b: bytes = b", ") -> bytes:
+        # UTF-8 in, UTF-8 out: for callers doing binary I/O, skips the str decode/encode round trip
+        if not _HAS_LEN_API:
+            text_b.decode('utf-8')
+            delimiter_b.decode('utf-8')
+            return self._take_bytes(self.lib.opencc_jieba_cut_and_join(self.opencc_instance, text_b, hmm,
+                                                                       delimiter_b))
+        out_len = ctypes.c_size_t()
+        result_ptr = self.lib.opencc_jieba_cut_and_join_len(self.opencc_instance, text_b, hmm, delimiter_b,
+                                                            ctypes.byref(out_len))
+        if not result_ptr:
+            _raise_invalid_utf8(text_b, delimiter_b)
+        return self._take_bytes(result_ptr, out_len.value)
 
     def jieba_join_str(self, strings: List[str], delimiter: str = " ") -> str:
-        # Convert the list of strings to a list of c_char_p
-        string_pointers = [ctypes.c_char_p(s.encode('utf-8')) for s in strings]
-        # Append a NULL pointer to the end of the array
-        string_pointers.append(None)
-        # Convert the list of c_char_p to a ctypes pointer to c_char_p
-        string_array = (ctypes.c_char_p * len(string_pointers))(*string_pointers)
+        if not _HAS_LEN_API:
+            string_array = (ctypes.c_char_p * (len(strings) + 1))(*map(str.encode, strings), None)
+            return self._take_bytes(self.lib.join_str(string_array, delimiter.encode('utf-8'))).decode('utf-8')
+        # Pack the encoded strings into one buffer, with their byte lengths alongside
+        encoded = list(map(str.encode, strings))
+        lengths = array.array('I', map(len, encoded))
+        length_array = (ctypes.c_uint32 * len(lengths)).from_buffer(lengths)
         # Call the C function
-        result = self.lib.join_str(string_array, delimiter.encode('utf-8'))
+        out_len = ctypes.c_size_t()
+        result_ptr = self.lib.join_str_packed(b"".join(encoded), length_array, len(lengths),
+                                              delimiter.encode('utf-8'), ctypes.byref(out_len))
+        # The joined string goes back as a C string, so a NUL anywhere in it is refused
+        if not result_ptr:
+            raise ValueError("embedded null character")
+        return self._take_string(result_ptr, out_len.value)
+
+    def _take_bytes(self, result_ptr, length=-1):
+        # Copy a string returned by the DLL into bytes, then release the native buffer; without
+        # a length the string is read up to its NUL terminator
+        try:
+            return ctypes.string_at(result_ptr, length)
+        finally:
+            self.lib.opencc_string_free(result_ptr)
 
-        return result.decode('utf-8')
+    def _take_string(self, result_ptr, length):
+        # Decode a string returned by the DLL, then release the native buffer
+        try:
+            return _decode_utf8(result_ptr, length, None)
+        finally:
+            self.lib.opencc_string_free(result_ptr)
@@ -3,16 +3,23 @@ from opencc_jieba_rs import OpenCC
 config = "s2t"
 input_text = "白日依山尽，黄河入海流"
 input_text2 = "數大了似乎按照著一種自然律，自然的會有一種特別的排列，一種特別的節奏，一種特殊的式樣，激動我們審美的本能，激發我們審美的情緒。"
-opencc = OpenCC()
+opencc = OpenCC.default()
 converted = opencc.convert(input_text)
+converted_bytes = opencc.convert_bytes(input_text.encode('utf-8'))
+out_buf = bytearray()
+converted_len = opencc.convert_into(input_text.encode('utf-8'), out_buf)
 text_code = opencc.zho_check(input_text)
 cut_str = opencc.jieba_cut(input_text, True)
 cut_str_join = opencc.jieba_cut_and_join(input_text2, True, "/ ")
+cut_bytes_join = opencc.jieba_cut_and_join_bytes(input_text2.encode('utf-8'), True, b"/ ")
 str_list = ['白日', '依山', '尽', '，', '黄河', '入海流']
 join_str_list = opencc.jieba_join_str(str_list, "; ")
 print(converted)
+print(converted_bytes.decode('utf-8'))
+print(out_buf[:converted_len].decode('utf-8'))
 print(text_code)
 print(input_text[-2:])
 print(cut_str)
 print(cut_str_join)
+print(cut_bytes_join.decode('utf-8'))
 print(join_str_list)